@@ -1,9 +1,25 @@
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import re
+import gzip
+import html
+import unicodedata
+from flask import Flask, request, jsonify, send_from_directory, Response
 from flask_cors import CORS
+from config import Config
 from rag.engine import get_rag_engine
+from rag.hierarchical_index import HierarchicalIndex
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -12,6 +28,8 @@ CORS(app)
 
 rag_engine = None
 
+DOCUMENT_FIELDS = ('id', 'content', 'snippet', 'type', 'metadata')
+
 def get_rag_engine_instance():
     """Lazy initialization of RAG engine"""
     global rag_engine
@@ -20,6 +38,127 @@ def get_rag_engine_instance():
         rag_engine = get_rag_engine()
     return rag_engine
 
+def json_response(payload, status=200):
+    """Serialize payload with orjson when available, falling back to jsonify"""
+    if orjson is None:
+        return jsonify(payload), status
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
+def parse_fields(data):
+    """Parse the requested document fields, defaulting to the full document"""
+    fields = data.get('fields')
+    if fields is None:
+        return ['id', 'content', 'type', 'metadata']
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+    elif not isinstance(fields, list):
+        raise ValueError('fields must be a list or a comma-separated string')
+    unknown = [field for field in fields if field not in DOCUMENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(map(str, unknown))}")
+    return fields
+
+def parse_int(data, key, default):
+    """Read an integer parameter from the request body, rejecting floats and booleans"""
+    value = data.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f'{key} must be an integer')
+    return value
+
+def parse_pagination(data):
+    """Parse offset/limit from the request body, honouring legacy top_k"""
+    offset = parse_int(data, 'offset', 0)
+    limit = parse_int(data, 'limit', parse_int(data, 'top_k', Config.TOP_K_RESULTS))
+    if offset < 0 or limit < 1:
+        raise ValueError('offset must be >= 0 and limit must be >= 1')
+    return offset, min(limit, Config.MAX_PAGE_SIZE)
+
+def fold_case(text):
+    """Lowercase Azerbaijani text (İ -> i, I -> ı) without changing its length"""
+    return text.replace('İ', 'i').replace('I', 'ı').lower()
+
+def make_snippet(content, query, width=None):
+    """Cut a window of content around the first query term match and highlight the terms"""
+    if width is None:
+        width = Config.SNIPPET_WIDTH
+    content = unicodedata.normalize('NFC', content)
+    query = unicodedata.normalize('NFC', query)
+    terms = [term for term in re.findall(r'\w+', fold_case(query)) if len(term) > 2]
+    folded = fold_case(content)
+    if not terms or len(folded) != len(content):
+        return html.escape(content[:width])
+
+    pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)))
+    match = pattern.search(folded)
+    start = 0
+    if match:
+        start = max(0, match.start() - width // 3)
+    end = min(len(content), start + width)
+
+    # Match on the case-folded text, but emit the original text escaped for HTML
+    parts = []
+    position = start
+    for term_match in pattern.finditer(folded, start, end):
+        parts.append(html.escape(content[position:term_match.start()]))
+        parts.append(f"<mark>{html.escape(content[term_match.start():term_match.end()])}</mark>")
+        position = term_match.end()
+    parts.append(html.escape(content[position:end]))
+
+    snippet = ''.join(parts)
+    if start > 0:
+        snippet = '...' + snippet
+    if end < len(content):
+        snippet = snippet + '...'
+    return snippet
+
+def format_results(search_results, query, fields):
+    """Project search results onto the requested document fields"""
+    formatted_results = []
+    for doc, score in search_results:
+        document = {}
+        for field in fields:
+            if field == 'snippet':
+                document['snippet'] = make_snippet(doc['content'], query)
+            else:
+                document[field] = doc[field]
+        formatted_results.append({
+            'document': document,
+            'similarity_score': float(score)
+        })
+    return formatted_results
+
+def search_page(rag_engine, query, offset, limit):
+    """Retrieve one page of the ranked result list"""
+    search_results = rag_engine.search_documents(query, offset + limit)
+    return search_results[offset:offset + limit]
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON responses with brotli or gzip when the client accepts it"""
+    if (response.mimetype != 'application/json'
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.COMPRESSION_MIN_SIZE:
+        return response
+
+    br_quality = request.accept_encodings['br'] if brotli is not None else 0
+    gzip_quality = request.accept_encodings['gzip']
+    if br_quality > 0 and br_quality >= gzip_quality:
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif gzip_quality > 0:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+
+    response.headers['Content-Length'] = len(response.get_data())
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/')
 def serve_web_interface():
     """Serve the main web interface"""
@@ -65,29 +204,24 @@ def query_documents():
             }), 400
             
         question = data['question']
-        top_k = data.get('top_k', 5)
-        
-        search_results = rag_engine.search_documents(question, top_k)
+        try:
+            fields = parse_fields(data)
+            offset, limit = parse_pagination(data)
+        except (TypeError, ValueError) as e:
+            return json_response({'error': str(e)}, 400)
         
-        answer = rag_engine.generate_answer(question, search_results)
+        # The answer is always built from the first page, so it does not change
+        # as the client pages through relevant_documents
+        search_results = rag_engine.search_documents(question, offset + limit)
         
-        formatted_results = [
-            {
-                'document': {
-                    'id': doc['id'],
-                    'content': doc['content'],
-                    'type': doc['type'],
-                    'metadata': doc['metadata']
-                },
-                'similarity_score': float(score)
-            }
-            for doc, score in search_results
-        ]
+        answer = rag_engine.generate_answer(question, search_results[:limit])
         
-        return jsonify({
+        return json_response({
             'question': question,
             'answer': answer,
-            'relevant_documents': formatted_results
+            'offset': offset,
+            'limit': limit,
+            'relevant_documents': format_results(search_results[offset:offset + limit], question, fields)
         })
         
     except Exception as e:
@@ -96,6 +230,39 @@ def query_documents():
             'error': f'Error processing query: {str(e)}'
         }), 500
 
+@app.route('/documents/<doc_id>/related', methods=['GET'])
+def related_documents(doc_id):
+    """Related articles endpoint"""
+    try:
+        rag_engine = get_rag_engine_instance()
+        
+        if rag_engine.get_document(doc_id) is None:
+            return json_response({
+                'error': f'Document not found: {doc_id}'
+            }, 404)
+            
+        try:
+            fields = parse_fields(request.args)
+            top_n = int(request.args.get('top_n', Config.RELATED_TOP_N))
+            if top_n < 1:
+                raise ValueError('top_n must be >= 1')
+            top_n = min(top_n, Config.MAX_PAGE_SIZE)
+        except (TypeError, ValueError) as e:
+            return json_response({'error': str(e)}, 400)
+        
+        related = rag_engine.get_related_documents(doc_id, top_n)
+        
+        return json_response({
+            'document_id': doc_id,
+            'related': format_results(related, '', fields)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error fetching related documents: {e}")
+        return json_response({
+            'error': f'Error fetching related documents: {str(e)}'
+        }, 500)
+
 @app.route('/search', methods=['POST'])
 def search_documents():
     """Search documents endpoint"""
@@ -109,26 +276,39 @@ def search_documents():
             }), 400
             
         query = data['query']
-        top_k = data.get('top_k', 5)
+        level = data.get('level')
+        try:
+            fields = parse_fields(data)
+            offset, limit = parse_pagination(data)
+            if level is not None and level not in HierarchicalIndex.LEVELS:
+                raise ValueError(f"level must be one of: {', '.join(HierarchicalIndex.LEVELS)}")
+            articles_per_node = parse_int(data, 'articles_per_node', Config.TOP_K_RESULTS)
+            if articles_per_node < 1:
+                raise ValueError('articles_per_node must be >= 1')
+        except (TypeError, ValueError) as e:
+            return json_response({'error': str(e)}, 400)
         
-        search_results = rag_engine.search_documents(query, top_k)
+        if level is not None:
+            subtrees = rag_engine.search_hierarchical(query, offset + limit, articles_per_node, level)
+            return json_response({
+                'query': query,
+                'level': level,
+                'offset': offset,
+                'limit': limit,
+                'subtrees': [
+                    dict(format_results([(subtree['document'], subtree['score'])], query, fields)[0],
+                         articles=format_results(subtree['articles'], query, fields))
+                    for subtree in subtrees[offset:offset + limit]
+                ]
+            })
         
-        formatted_results = [
-            {
-                'document': {
-                    'id': doc['id'],
-                    'content': doc['content'],
-                    'type': doc['type'],
-                    'metadata': doc['metadata']
-                },
-                'similarity_score': float(score)
-            }
-            for doc, score in search_results
-        ]
+        search_results = search_page(rag_engine, query, offset, limit)
         
-        return jsonify({
+        return json_response({
             'query': query,
-            'results': formatted_results
+            'offset': offset,
+            'limit': limit,
+            'results': format_results(search_results, query, fields)
         })
         
     except Exception as e:
@@ -14,4 +14,17 @@ class Config:
     CHUNK_OVERLAP = 200
     
     TOP_K_RESULTS = 5
-    SIMILARITY_THRESHOLD = 0.01
\ No newline at end of file
+    SIMILARITY_THRESHOLD = 0.01
+
+    MAX_PAGE_SIZE = 50
+    SNIPPET_WIDTH = 240
+    COMPRESSION_MIN_SIZE = 1024
+
+    RELATED_TOP_N = 5
+    RELATED_CONTEXT_EXPANSION = 0
+
+    BATCH_SIZE = 32
+    BATCH_CONCURRENCY = 4
+
+    HIERARCHICAL_RETRIEVAL = False
+    HIERARCHY_ROLLUP_TOP = 3
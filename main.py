@@ -7,9 +7,12 @@ import sys
 import os
 import logging
 import subprocess
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from config import Config
 from rag.engine import get_rag_engine
 from api.app import app
 import webbrowser
@@ -43,15 +46,139 @@ def open_browser():
     time.sleep(2)
     webbrowser.open('http://localhost:5000')
 
+def load_batch_questions(input_path):
+    """Load questions from a JSONL file (question or title/body per line)"""
+    questions = []
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping line {line_number}: invalid JSON ({e})")
+                continue
+            if not isinstance(item, dict):
+                logger.warning(f"Skipping line {line_number}: not a JSON object")
+                continue
+            question = item.get('question') or item.get('body') or item.get('title')
+            if not isinstance(question, str) or not question.strip():
+                logger.warning(f"Skipping line {line_number}: no question text")
+                continue
+            question_id = item.get('request_id') or item.get('id') or str(line_number)
+            questions.append({'id': str(question_id), 'question': question})
+    return questions
+
+def load_completed_ids(output_path):
+    """Collect ids already written to the output file so a run can resume"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                completed.add(json.loads(line)['id'])
+            except (ValueError, KeyError, TypeError):
+                # Partial line left by an interrupted run
+                continue
+    return completed
+
+def answer_question(rag_engine, item, context_docs):
+    """Answer a single batch question and time the model call"""
+    start = time.perf_counter()
+    answer = rag_engine.generate_answer(item['question'], context_docs, raise_on_error=True)
+    return {
+        'id': item['id'],
+        'question': item['question'],
+        'answer': answer,
+        'document_ids': [doc['id'] for doc, _ in context_docs],
+        'latency': time.perf_counter() - start
+    }
+
+def run_batch(rag_engine, input_path, output_path, batch_size, concurrency):
+    """Answer a JSONL file of questions, streaming results to a JSONL output"""
+    questions = load_batch_questions(input_path)
+    completed = load_completed_ids(output_path)
+    pending = [item for item in questions if item['id'] not in completed]
+    skipped = len(questions) - len(pending)
+    logger.info(f"Batch: {len(questions)} questions, {skipped} already done, {len(pending)} pending")
+
+    latencies = []
+    failed = 0
+    start = time.perf_counter()
+
+    needs_newline = os.path.exists(output_path) and os.path.getsize(output_path) > 0
+    if needs_newline:
+        with open(output_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if needs_newline:
+            out.write('\n')
+
+        for batch_start in range(0, len(pending), batch_size):
+            batch = pending[batch_start:batch_start + batch_size]
+            try:
+                batch_results = rag_engine.search_documents_batch([item['question'] for item in batch])
+            except Exception as e:
+                failed += len(batch)
+                logger.error(f"Error retrieving batch at {batch_start}: {e}")
+                continue
+
+            futures = {
+                executor.submit(answer_question, rag_engine, item, context_docs): item
+                for item, context_docs in zip(batch, batch_results)
+            }
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Error answering {futures[future]['id']}: {e}")
+                    continue
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+                latencies.append(record['latency'])
+
+            logger.info(f"Batch progress: {batch_start + len(batch)}/{len(pending)}")
+
+    elapsed = time.perf_counter() - start
+    print_batch_stats(len(latencies), failed, skipped, elapsed, latencies)
+
+def print_batch_stats(answered, failed, skipped, elapsed, latencies):
+    """Print throughput and latency statistics for a batch run"""
+    print(f"\nAnswered: {answered}, failed: {failed}, skipped (already done): {skipped}")
+    print(f"Elapsed: {elapsed:.1f}s, throughput: {answered / elapsed if elapsed > 0 else 0:.2f} questions/s")
+    if latencies:
+        latencies = sorted(latencies)
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"Latency: mean {sum(latencies) / len(latencies):.2f}s, p50 {p50:.2f}s, p95 {p95:.2f}s, max {latencies[-1]:.2f}s")
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description='Legal RAG System for Azerbaijani Criminal Law')
-    parser.add_argument('--mode', choices=['api', 'web', 'cli'], default='cli',
-                       help='Run mode: api (REST API), web (Web interface), cli (Command line)')
+    parser.add_argument('--mode', choices=['api', 'web', 'cli', 'batch'], default='cli',
+                       help='Run mode: api (REST API), web (Web interface), cli (Command line), batch (JSONL file)')
     parser.add_argument('--question', type=str, help='Question to ask (for CLI mode)')
+    parser.add_argument('--input', type=str, help='Input JSONL of questions (for batch mode)')
+    parser.add_argument('--output', type=str, default='answers.jsonl',
+                       help='Output JSONL, also used to resume (for batch mode)')
+    parser.add_argument('--batch-size', type=int, default=Config.BATCH_SIZE,
+                       help='Questions retrieved per batch (for batch mode)')
+    parser.add_argument('--concurrency', type=int, default=Config.BATCH_CONCURRENCY,
+                       help='Concurrent model calls (for batch mode)')
     
     args = parser.parse_args()
     
+    if args.mode == 'batch' and not args.input:
+        parser.error('--input is required for batch mode')
+    if args.batch_size < 1 or args.concurrency < 1:
+        parser.error('--batch-size and --concurrency must be at least 1')
+    
     logger.info("Initializing RAG engine...")
     rag_engine = get_rag_engine()
     
@@ -86,6 +213,9 @@ def main():
                 except Exception as e:
                     print(f"Error: {e}")
                     
+    elif args.mode == 'batch':
+        run_batch(rag_engine, args.input, args.output, args.batch_size, args.concurrency)
+        
     elif args.mode == 'api':
         run_api_server()
         
@@ -1,9 +1,10 @@
 import google.generativeai as genai
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import logging
 from config import Config
 from processing.document_processor import LegalDocumentProcessor
 from rag.vector_store import VectorStore
+from rag.hierarchical_index import HierarchicalIndex
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,6 +16,7 @@ class RAGEngine:
         self.config = Config()
         self.processor = LegalDocumentProcessor()
         self.vector_store = VectorStore()
+        self.hierarchical_index = HierarchicalIndex(self.vector_store, self.config.HIERARCHY_ROLLUP_TOP)
         self.model = None
         
         if self.config.GEMINI_API_KEY:
@@ -33,6 +35,8 @@ class RAGEngine:
         documents = self.processor.load_documents()
         
         self.vector_store.add_documents(documents)
+        self.vector_store.build_related_graph(top_n=self.config.RELATED_TOP_N)
+        self.hierarchical_index.build()
         
         logger.info(f"Indexed {self.vector_store.get_document_count()} documents")
         
@@ -41,17 +45,77 @@ class RAGEngine:
         if top_k is None:
             top_k = self.config.TOP_K_RESULTS
             
+        if self.config.HIERARCHICAL_RETRIEVAL:
+            return self.hierarchical_index.search_articles(query, top_k)
+            
         return self.vector_store.search(
             query=query,
             top_k=top_k,
             threshold=self.config.SIMILARITY_THRESHOLD
         )
         
-    def generate_answer(self, query: str, context_docs: List[Tuple[Dict, float]] = None) -> str:
-        """Generate answer using RAG approach"""
+    def search_hierarchical(self, query: str, top_nodes: int = 1, articles_per_node: int = None,
+                            level: str = 'chapter') -> List[Dict]:
+        """Search for the best chapter/section subtrees with their top articles"""
+        if articles_per_node is None:
+            articles_per_node = self.config.TOP_K_RESULTS
+            
+        return self.hierarchical_index.search(query, top_nodes, articles_per_node, level)
+        
+    def search_documents_batch(self, queries: List[str], top_k: int = None) -> List[List[Tuple[Dict, float]]]:
+        """Search for relevant documents for several queries at once"""
+        if top_k is None:
+            top_k = self.config.TOP_K_RESULTS
+            
+        if self.config.HIERARCHICAL_RETRIEVAL:
+            return [self.hierarchical_index.search_articles(query, top_k) for query in queries]
+            
+        return self.vector_store.search_batch(
+            queries=queries,
+            top_k=top_k,
+            threshold=self.config.SIMILARITY_THRESHOLD
+        )
+        
+    def get_document(self, doc_id: str) -> Optional[Dict]:
+        """Get an indexed document by its id"""
+        return self.vector_store.get_document(doc_id)
+        
+    def get_related_documents(self, doc_id: str, top_n: int = None) -> List[Tuple[Dict, float]]:
+        """Get precomputed related articles for a document"""
+        if top_n is None:
+            top_n = self.config.RELATED_TOP_N
+            
+        return self.vector_store.get_related(doc_id, top_n)
+        
+    def _expand_with_related(self, context_docs: List[Tuple[Dict, float]], per_doc: int) -> List[Tuple[Dict, float]]:
+        """Append related articles of each context document, skipping duplicates"""
+        seen = {doc['id'] for doc, _ in context_docs}
+        expanded = list(context_docs)
+        
+        for doc, score in context_docs:
+            for related_doc, related_score in self.vector_store.get_related(doc['id'], per_doc):
+                if related_doc['id'] not in seen:
+                    seen.add(related_doc['id'])
+                    expanded.append((related_doc, score * related_score))
+                    
+        return expanded
+        
+    def generate_answer(self, query: str, context_docs: List[Tuple[Dict, float]] = None,
+                        expand_related: int = None, raise_on_error: bool = False) -> str:
+        """Generate answer using RAG approach
+
+        With raise_on_error, a missing model or a failed model call raises
+        instead of returning the fallback text.
+        """
         if context_docs is None:
             context_docs = self.search_documents(query)
             
+        if expand_related is None:
+            expand_related = self.config.RELATED_CONTEXT_EXPANSION
+            
+        if expand_related > 0:
+            context_docs = self._expand_with_related(context_docs, expand_related)
+            
         context_text = "\n\n".join([
             f"[Mənbə #{i+1} (Uyğunluq: {score:.2f})]\nID: {doc['id']}\nNöv: {doc['type']}\nMəzmun: {doc['content']}\nMetadata: {doc['metadata']}" 
             for i, (doc, score) in enumerate(context_docs)
@@ -64,9 +128,13 @@ class RAGEngine:
                 response = self.model.generate_content(prompt)
                 return response.text
             except Exception as e:
+                if raise_on_error:
+                    raise
                 logger.error(f"Error generating response with Gemini: {e}")
                 return self._fallback_response(query, context_text)
         else:
+            if raise_on_error:
+                raise RuntimeError("Gemini model is not configured")
             return self._fallback_response(query, context_text)
             
     def _create_prompt(self, query: str, context: str) -> str:
@@ -0,0 +1,120 @@
+import numpy as np
+from typing import List, Dict, Tuple
+import logging
+from rag.vector_store import VectorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HierarchicalIndex:
+    """Scores article documents only and rolls their scores up to chapters and sections"""
+
+    LEVELS = ('chapter', 'section')
+
+    def __init__(self, vector_store: VectorStore, rollup_top: int = 3):
+        self.vector_store = vector_store
+        self.rollup_top = rollup_top
+        self.article_rows = None
+        self.article_vectors = None
+        self.node_ids = {level: [] for level in self.LEVELS}
+        self.article_nodes = {level: None for level in self.LEVELS}
+
+    @staticmethod
+    def parent_ids(article_id: str) -> Dict[str, str]:
+        """Derive chapter and section ids from an article id (section_X_chapter_Y_article_Z)"""
+        chapter_id = article_id.rsplit('_article_', 1)[0]
+        section_id = chapter_id.rsplit('_chapter_', 1)[0]
+        return {'chapter': chapter_id, 'section': section_id}
+
+    def build(self) -> None:
+        """Index the article rows of the vector store and their chapter/section parents"""
+        documents = self.vector_store.documents
+        self.article_rows = np.array(
+            [idx for idx, doc in enumerate(documents) if doc['type'] == 'article'],
+            dtype=np.int32
+        )
+        if len(self.article_rows) == 0:
+            logger.warning("No article documents to build hierarchical index")
+            return
+
+        self.article_vectors = self.vector_store.document_vectors[self.article_rows]
+
+        for level in self.LEVELS:
+            node_positions = {}
+            article_nodes = []
+            for idx in self.article_rows:
+                node_id = self.parent_ids(documents[idx]['id'])[level]
+                article_nodes.append(node_positions.setdefault(node_id, len(node_positions)))
+            self.node_ids[level] = list(node_positions)
+            self.article_nodes[level] = np.array(article_nodes, dtype=np.int32)
+
+        logger.info(f"Hierarchical index built: {len(self.article_rows)} articles, "
+                    f"{len(self.node_ids['chapter'])} chapters, {len(self.node_ids['section'])} sections")
+
+    def search(self, query: str, top_nodes: int = 1, articles_per_node: int = 5,
+               level: str = 'chapter') -> List[Dict]:
+        """Return the best-scoring subtrees at the given level with their top articles"""
+        if level not in self.LEVELS:
+            raise ValueError(f"Unknown level: {level}")
+        if self.article_vectors is None:
+            logger.warning("Hierarchical index is empty")
+            return []
+
+        # TF-IDF rows and the query vector are L2-normalised, so a sparse dot
+        # product against the article rows alone gives the cosine similarities
+        query_vector = self.vector_store.vectorizer.transform([query])
+        similarities = (self.article_vectors @ query_vector.T).toarray().ravel()
+
+        # Order articles by node, best score first within each node, then keep
+        # the first rollup_top positive scores of every node. A node's score is
+        # their sum, so a large chapter full of weak matches does not outrank a
+        # focused one
+        article_nodes = self.article_nodes[level]
+        order = np.lexsort((-similarities, article_nodes))
+        sorted_nodes = article_nodes[order]
+        sorted_scores = similarities[order]
+        node_starts = np.searchsorted(sorted_nodes, sorted_nodes, side='left')
+        ranks = np.arange(len(order)) - node_starts
+        keep = (ranks < self.rollup_top) & (sorted_scores > 0)
+        node_scores = np.bincount(sorted_nodes[keep], weights=sorted_scores[keep],
+                                  minlength=len(self.node_ids[level]))
+
+        top_nodes = min(top_nodes, len(node_scores))
+        best = np.argpartition(-node_scores, top_nodes - 1)[:top_nodes]
+        best = best[np.argsort(-node_scores[best])]
+
+        results = []
+        for node in map(int, best):
+            if node_scores[node] <= 0:
+                break
+            start = np.searchsorted(sorted_nodes, node, side='left')
+            positions = order[start:start + articles_per_node]
+            positions = positions[article_nodes[positions] == node]
+            node_id = self.node_ids[level][node]
+            document = self.vector_store.get_document(node_id) or {
+                'id': node_id,
+                'content': '',
+                'type': level,
+                'metadata': {}
+            }
+            results.append({
+                'document': document,
+                'score': float(node_scores[node]),
+                'articles': [
+                    (self.vector_store.documents[self.article_rows[pos]], float(similarities[pos]))
+                    for pos in positions
+                    if similarities[pos] > 0
+                ]
+            })
+
+        logger.info(f"Hierarchical search returned {len(results)} {level} subtrees")
+        return results
+
+    def search_articles(self, query: str, top_k: int = 5, level: str = 'chapter') -> List[Tuple[Dict, float]]:
+        """Return top articles taken from the best subtrees first, filling from the next ones"""
+        results = []
+        for subtree in self.search(query, top_nodes=top_k, articles_per_node=top_k, level=level):
+            results.extend(subtree['articles'][:top_k - len(results)])
+            if len(results) >= top_k:
+                break
+        return results
@@ -1,7 +1,9 @@
+import os
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -18,12 +20,22 @@ class VectorStore:
         )
         self.document_vectors = None
         self.documents = []
+        self.document_index = {}
+        self.related_rows = {}
+        self.related_indices = None
+        self.related_scores = None
         
     def add_documents(self, documents: List[Dict[str, any]]) -> None:
         """Add documents to the vector store"""
         logger.info(f"Adding {len(documents)} documents to vector store...")
         
         self.documents = documents
+        self.document_index = {}
+        for idx, doc in enumerate(documents):
+            self.document_index.setdefault(doc['id'], idx)
+        self.related_rows = {}
+        self.related_indices = None
+        self.related_scores = None
         contents = [doc['content'] for doc in documents]
         
         self.document_vectors = self.vectorizer.fit_transform(contents)
@@ -54,6 +66,88 @@ class VectorStore:
         logger.info(f"Returning {len(results)} documents")
         return results
         
+    def search_batch(self, queries: List[str], top_k: int = 5, threshold: float = 0.01) -> List[List[Tuple[Dict, float]]]:
+        """Search for relevant documents for several queries with a single similarity product"""
+        if self.document_vectors is None or len(self.documents) == 0:
+            logger.warning("No documents in vector store")
+            return [[] for _ in queries]
+            
+        query_vectors = self.vectorizer.transform(queries)
+        
+        similarities = cosine_similarity(query_vectors, self.document_vectors)
+        
+        batch_results = []
+        for row in similarities:
+            top_indices = np.argsort(row)[::-1][:top_k]
+            batch_results.append([
+                (self.documents[idx], row[idx])
+                for idx in top_indices
+                if row[idx] >= threshold or row[idx] > 0.001
+            ])
+            
+        logger.info(f"Batch search for {len(queries)} queries")
+        return batch_results
+        
+    def build_related_graph(self, top_n: int = 5, block_size: int = 256, doc_type: str = 'article') -> None:
+        """Precompute the top-N most similar documents of the given type for every such document"""
+        if self.document_vectors is None:
+            logger.warning("No documents in vector store")
+            return
+
+        # Repeated ids resolve to their first document, as in document_index, so a
+        # document can never be listed as related to itself
+        candidates = np.array(sorted({
+            doc['id']: self.document_index[doc['id']]
+            for doc in self.documents
+            if doc['type'] == doc_type
+        }.values()), dtype=np.int32)
+        top_n = min(top_n, len(candidates) - 1)
+        if top_n < 1:
+            return
+
+        # TF-IDF rows are L2-normalised, so the sparse dot product is the cosine similarity
+        vectors = self.document_vectors[candidates]
+        vectors_t = vectors.T.tocsc()
+
+        def score_block(start: int) -> Tuple[np.ndarray, np.ndarray]:
+            stop = min(start + block_size, len(candidates))
+            similarities = (vectors[start:stop] @ vectors_t).toarray()
+            similarities[np.arange(stop - start), np.arange(start, stop)] = -1.0
+
+            top = np.argpartition(-similarities, top_n - 1, axis=1)[:, :top_n]
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            return (candidates[np.take_along_axis(top, order, axis=1)],
+                    np.take_along_axis(top_scores, order, axis=1).astype(np.float32))
+
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+            blocks = list(executor.map(score_block, range(0, len(candidates), block_size)))
+
+        self.related_indices = np.vstack([indices for indices, _ in blocks])
+        self.related_scores = np.vstack([scores for _, scores in blocks])
+        self.related_rows = {self.documents[idx]['id']: row for row, idx in enumerate(candidates)}
+
+        logger.info(f"Related graph built for {len(candidates)} {doc_type} documents (top {top_n})")
+
+    def get_document(self, doc_id: str) -> Optional[Dict]:
+        """Get a document by its id"""
+        idx = self.document_index.get(doc_id)
+        return self.documents[idx] if idx is not None else None
+
+    def get_related(self, doc_id: str, top_n: Optional[int] = None) -> List[Tuple[Dict, float]]:
+        """Get the precomputed most similar documents for a document"""
+        row = self.related_rows.get(doc_id)
+        if row is None:
+            return []
+
+        indices = self.related_indices[row][:top_n]
+        scores = self.related_scores[row][:top_n]
+        return [
+            (self.documents[idx], float(score))
+            for idx, score in zip(indices, scores)
+            if score > 0
+        ]
+
     def get_document_count(self) -> int:
         """Get the number of documents in the vector store"""
         return len(self.documents) if self.documents else 0
@@ -7,6 +7,9 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from rag.engine import get_rag_engine
+from main import load_batch_questions, load_completed_ids, run_batch
+import json
+import tempfile
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -46,5 +49,52 @@ def test_queries():
         answer = rag_engine.generate_answer(query, results)
         print(answer)
 
+def test_batch_mode():
+    """Test batch input parsing, resume bookkeeping and failed model calls"""
+    print("\n=== Testing Batch Mode ===")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = os.path.join(tmp_dir, 'questions.jsonl')
+        output_path = os.path.join(tmp_dir, 'answers.jsonl')
+        with open(input_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'request_id': 'q1', 'title': 'Cinayət törətmək'}, ensure_ascii=False) + '\n')
+            f.write('{not json\n')
+            f.write('[1, 2]\n')
+            f.write(json.dumps({'id': 'q2'}) + '\n')
+            f.write(json.dumps({'id': 'q4', 'question': 123}) + '\n')
+            f.write(json.dumps({'id': 'q5', 'question': ['a']}) + '\n')
+            f.write(json.dumps({'id': 'q3', 'question': 'Cəza nədir?'}, ensure_ascii=False) + '\n')
+        
+        questions = load_batch_questions(input_path)
+        assert [item['id'] for item in questions] == ['q1', 'q3']
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'id': 'q1', 'answer': '...'}) + '\n')
+            f.write('"just a string"\n')
+            f.write('{"id": "q3", "ans')
+        assert load_completed_ids(output_path) == {'q1'}
+        
+        rag_engine = get_rag_engine()
+        
+        # A retrieval error fails its batch without stopping the run
+        def failing_search(queries, top_k=None):
+            raise RuntimeError("retrieval failed")
+        rag_engine.search_documents_batch = failing_search
+        try:
+            run_batch(rag_engine, input_path, output_path, batch_size=1, concurrency=1)
+        finally:
+            del rag_engine.search_documents_batch
+        assert load_completed_ids(output_path) == {'q1'}
+        
+        if rag_engine.model is None:
+            # Without a model every pending question fails and must not be recorded as done
+            run_batch(rag_engine, input_path, output_path, batch_size=2, concurrency=2)
+            assert load_completed_ids(output_path) == {'q1'}
+            print("Failed model calls were left out of the output")
+        else:
+            run_batch(rag_engine, input_path, output_path, batch_size=2, concurrency=2)
+            assert load_completed_ids(output_path) == {'q1', 'q3'}
+
 if __name__ == "__main__":
-    test_queries()
\ No newline at end of file
+    test_queries()
+    test_batch_mode()
\ No newline at end of file
@@ -8,6 +8,9 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from rag.engine import get_rag_engine
+from api.app import app, make_snippet
+import gzip
+import json
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -38,5 +41,103 @@ def test_system():
     answer = rag_engine.generate_answer(test_query, results[:2])
     print(f"Generated answer:\n{answer}")
 
+def test_api_responses():
+    """Test field projection, snippets, pagination and compression of /search"""
+    print("\nTesting API response shaping...")
+    client = app.test_client()
+    query = "cinayət törətmək"
+    
+    full = client.post('/search', json={'query': query, 'limit': 6}).get_json()
+    page = client.post('/search', json={
+        'query': query, 'fields': ['id', 'snippet'], 'offset': 3, 'limit': 3
+    }).get_json()
+    assert [r['document']['id'] for r in page['results']] == [r['document']['id'] for r in full['results'][3:6]]
+    assert all(set(r['document']) == {'id', 'snippet'} for r in page['results'])
+    print(f"Page 2 ids: {[r['document']['id'] for r in page['results']]}")
+    
+    snippet = make_snippet("32. İştirakçılıq <anlayışı>", "İştirakçılıq nədir")
+    assert '<mark>İştirakçılıq</mark>' in snippet and '&lt;anlayışı&gt;' in snippet
+    print(f"Snippet: {snippet}")
+    
+    rag_engine = get_rag_engine()
+    contexts = []
+    original_generate_answer = rag_engine.generate_answer
+    rag_engine.generate_answer = lambda question, docs: contexts.append([doc['id'] for doc, _ in docs]) or ''
+    try:
+        for offset in (0, 3, 5000):
+            client.post('/query', json={'question': query, 'offset': offset, 'limit': 3})
+    finally:
+        rag_engine.generate_answer = original_generate_answer
+    assert len(contexts) == 3 and contexts[0] == contexts[1] == contexts[2] and len(contexts[0]) <= 3
+    print(f"Answer context for every page: {contexts[0]}")
+    
+    for body in ({'query': query, 'fields': {'id': 1}}, {'query': query, 'limit': 1.9}):
+        assert client.post('/search', json=body).status_code == 400
+    
+    response = client.post('/search', json={'query': query, 'limit': 10},
+                           headers={'Accept-Encoding': 'gzip'})
+    assert response.headers.get('Content-Encoding') == 'gzip'
+    assert json.loads(gzip.decompress(response.data))['results']
+    print(f"Compressed /search response: {len(response.data)} bytes")
+    
+    for accept_encoding, expected in (('gzip;q=0, identity', None), ('gzip, br;q=0', 'gzip'),
+                                      ('gzip;q=0.5, br', 'br'), ('brx', None)):
+        response = client.post('/search', json={'query': query, 'limit': 10},
+                               headers={'Accept-Encoding': accept_encoding})
+        assert response.headers.get('Content-Encoding') == expected, accept_encoding
+
+def test_related_documents():
+    """Test the precomputed related-article endpoint"""
+    print("\nTesting related documents...")
+    client = app.test_client()
+    doc_id = 'section_BİRİNCİ_chapter_1_article_1'
+    
+    response = client.get(f'/documents/{doc_id}/related?top_n=3&fields=id')
+    related = response.get_json()['related']
+    assert response.status_code == 200 and 0 < len(related) <= 3
+    assert doc_id not in [r['document']['id'] for r in related]
+    print(f"Related to {doc_id}: {[r['document']['id'] for r in related]}")
+    
+    # This article id occurs more than once in the source data
+    duplicate_id = 'section_SƏKKİZİNCİ_chapter_21_article_165'
+    related = client.get(f'/documents/{duplicate_id}/related?fields=id').get_json()['related']
+    related_ids = [r['document']['id'] for r in related]
+    assert related and duplicate_id not in related_ids and len(set(related_ids)) == len(related_ids)
+    
+    for top_n in ('0', '-2', 'abc'):
+        assert client.get(f'/documents/{doc_id}/related?top_n={top_n}').status_code == 400
+    assert client.get('/documents/missing/related').status_code == 404
+
+def test_hierarchical_search():
+    """Test subtree retrieval and the article rollup"""
+    print("\nTesting hierarchical search...")
+    client = app.test_client()
+    
+    response = client.post('/search', json={
+        'query': 'cəza növləri', 'level': 'chapter', 'limit': 2, 'articles_per_node': 3, 'fields': ['id']
+    }).get_json()
+    subtrees = response['subtrees']
+    assert 0 < len(subtrees) <= 2
+    assert subtrees[0]['similarity_score'] >= subtrees[-1]['similarity_score']
+    for subtree in subtrees:
+        assert 0 < len(subtree['articles']) <= 3
+        assert all(a['document']['id'].startswith(subtree['document']['id'] + '_article_') for a in subtree['articles'])
+        print(f"{subtree['document']['id']} ({subtree['similarity_score']:.3f}): "
+              f"{[a['document']['id'] for a in subtree['articles']]}")
+    
+    assert client.post('/search', json={'query': 'cəza', 'level': 'article'}).status_code == 400
+    
+    rag_engine = get_rag_engine()
+    rag_engine.config.HIERARCHICAL_RETRIEVAL = True
+    try:
+        results = rag_engine.search_documents('cəza növləri', top_k=3)
+        assert results and all(doc['type'] == 'article' for doc, _ in results)
+        assert rag_engine.search_documents_batch(['cəza növləri'], top_k=3)[0] == results
+    finally:
+        rag_engine.config.HIERARCHICAL_RETRIEVAL = False
+
 if __name__ == "__main__":
     test_system()
+    test_api_responses()
+    test_related_documents()
+    test_hierarchical_search()